@@ -3,12 +3,12 @@ Main Job Application Agent
 Orchestrates job scraping, evaluation, cover letter generation, and tracking
 """
 
-import json
 from datetime import datetime
 from job_scraper import scrape_poslovi_infostud, save_jobs_to_file, load_jobs_from_file
 from job_evaluator import evaluate_multiple_jobs
 from cover_letter_generator import generate_cover_letters_for_matches
 from application_tracker import ApplicationTracker
+from persistence import write_records
 from config import RESUME
 
 class JobApplicationAgent:
@@ -38,7 +38,12 @@ class JobApplicationAgent:
         print("-" * 60)
         if scrape_new:
             print(f"Scraping jobs from poslovi.infostud.com ({max_pages} pages)...")
-            jobs = scrape_poslovi_infostud(max_pages=max_pages, limit=limit)
+            jobs, complete = scrape_poslovi_infostud(max_pages=max_pages, limit=limit)
+            if not complete:
+                # Partial results stay in the checkpoint; processing them now would
+                # repeat evaluation and cover letters when the crawl is resumed
+                print(f"✗ Scrape interrupted after {len(jobs)} jobs. Run again to resume.")
+                return
             save_jobs_to_file(jobs)
             print(f"✓ Scraped {len(jobs)} jobs")
         else:
@@ -80,24 +85,11 @@ class JobApplicationAgent:
         # Step 4: Generate cover letters
         print("STEP 4: GENERATING COVER LETTERS")
         print("-" * 60)
-        self.jobs_with_letters = []
-        for idx, job in enumerate(self.matched_jobs, 1):
-            print(f"Generating cover letter {idx}/{len(self.matched_jobs)}: {job.get('title', 'Unknown')}...")
-            
-            from cover_letter_generator import generate_cover_letter
-            cover_letter = generate_cover_letter(job, RESUME)
-            
-            job_with_letter = {
-                **job,
-                "cover_letter": cover_letter
-            }
-            
-            self.jobs_with_letters.append(job_with_letter)
-            
-            # Save incrementally every 2 jobs
-            if idx % 2 == 0:
-                self.save_results()
-                print(f"  (Auto-saved progress)")
+        self.jobs_with_letters = generate_cover_letters_for_matches(
+            self.matched_jobs,
+            RESUME,
+            on_progress=self._on_cover_letter_progress
+        )
         
         print(f"✓ Generated {len(self.jobs_with_letters)} cover letters")
         print()
@@ -111,12 +103,18 @@ class JobApplicationAgent:
         # Step 6: Display summary
         self.display_summary()
     
+    def _on_cover_letter_progress(self, count, jobs_with_letters):
+        """Keep results current and save incrementally every 2 jobs"""
+        self.jobs_with_letters = jobs_with_letters
+        if count % 2 == 0:
+            self.save_results()
+            print(f"  (Auto-saved progress)")
+    
     def save_results(self):
         """Save matched jobs with cover letters to file"""
-        output_file = f"matched_jobs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(self.jobs_with_letters, f, ensure_ascii=False, indent=2)
-        print(f"✓ Saved results to {output_file}")
+        output_file = f"matched_jobs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        path = write_records(self.jobs_with_letters, output_file)
+        print(f"✓ Saved results to {path}")
     
     def display_summary(self):
         """Display a summary of matched jobs with cover letters"""
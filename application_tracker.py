@@ -1,6 +1,6 @@
-import json
 from datetime import datetime
 from pathlib import Path
+from persistence import write_json, read_json
 
 class ApplicationTracker:
     """
@@ -13,16 +13,11 @@ class ApplicationTracker:
     
     def load(self):
         """Load applied jobs from file"""
-        try:
-            with open(self.filename, "r", encoding="utf-8") as f:
-                self.data = json.load(f)
-        except FileNotFoundError:
-            self.data = {"applied": []}
+        self.data = read_json(self.filename, default={"applied": []})
     
     def save(self):
         """Save applied jobs to file"""
-        with open(self.filename, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        write_json(self.data, self.filename)
     
     def mark_applied(self, job_link, job_title, company, notes=""):
         """Mark a job as applied"""
@@ -71,10 +66,9 @@ class ApplicationTracker:
         return new_jobs
     
     def export_report(self, filename="application_report.json"):
-        """Export a report of all applications"""
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
-        print(f"Report exported to {filename}")
+        """Export a readable report of all applications (always uncompressed)"""
+        path = write_json(self.data, filename, compression=None, indent=2)
+        print(f"Report exported to {path}")
 
 
 if __name__ == "__main__":
@@ -43,6 +43,7 @@ Java Coursework Projects | core Java, JDBC, SQL, Multithreading
 # LLM Configuration
 LLM_MODEL = "llama3"
 LLM_BASE_URL = "http://localhost:11434"  
+LLM_KEEP_ALIVE = "15m"  # Keep the model (and its cached prompt prefix) loaded between calls
 
 # Job board configuration
 JOB_SITES = {
@@ -58,3 +59,13 @@ JOB_SITES = {
         "max_pages": 1
     }
 }
+
+# Storage configuration
+STORAGE_COMPRESSION = None  # None, "gzip" or "zstd" (zstd needs the zstandard package)
+
+# Scraper resilience
+SCRAPER_CHECKPOINT_FILE = "scrape_checkpoint.json"  # Progress saved after every completed page
+SCRAPER_CHECKPOINT_MAX_AGE_HOURS = 24  # Older checkpoints are discarded instead of resumed
+SCRAPER_MAX_RETRIES = 4  # Extra attempts per page after the first failure
+SCRAPER_BACKOFF_BASE = 2  # Seconds, doubled on every retry
+SCRAPER_BACKOFF_MAX = 60  # Upper bound for a single retry delay
@@ -1,39 +1,60 @@
-import json
+import re
 from ollama import chat
-from config import LLM_MODEL, RESUME
+from persistence import write_records
+from config import LLM_MODEL, LLM_KEEP_ALIVE, RESUME
 
-def generate_cover_letter(job, resume=RESUME, candidate_name="[Your Name]"):
-    """
-    Generate a tailored cover letter for a specific job posting.
-    """
-    
-    prompt = f"""
-Write a professional, concise cover letter for the following position. The letter should be personalized based on the job requirements and the candidate's experience.
+SYSTEM_PROMPT = "You are a professional cover letter writer. Write concise, personalized cover letters."
 
-CANDIDATE RESUME:
-{resume}
+COVER_LETTER_REQUIREMENTS = """- Make it 3-4 paragraphs
+- Address the hiring manager as "Dear Hiring Manager"
+- Highlight 2-3 relevant skills from the candidate's resume that match the job
+- Show enthusiasm for the role and company
+- End with a professional closing
+- Keep it under 250 words"""
+
+LETTER_TASK = "Write a professional, concise cover letter for the following position. The letter should be personalized based on the job requirements and the candidate's experience."
 
-JOB POSTING:
+SESSION_TASK = "You will receive one job posting per message. For each posting, write a professional, concise cover letter personalized to the job requirements and the candidate's experience."
+
+
+def _format_job(job):
+    """Job-specific part of the prompt"""
+    return f"""JOB POSTING:
 Title: {job.get('title', 'N/A')}
 Company: {job.get('company', 'N/A')}
 Description: {job.get('description', 'N/A')}
+"""
+
+
+def _format_instructions(resume, candidate_name=None):
+    """Resume and writing requirements, shared by both prompt layouts"""
+    sign_off = f"\n- Sign the letter as {candidate_name}" if candidate_name else ""
+    return f"""CANDIDATE RESUME:
+{resume}
 
 REQUIREMENTS:
-- Make it 3-4 paragraphs
-- Address the hiring manager as "Dear Hiring Manager"
-- Highlight 2-3 relevant skills from the candidate's resume that match the job
-- Show enthusiasm for the role and company
-- End with a professional closing
-- Keep it under 250 words
+{COVER_LETTER_REQUIREMENTS}{sign_off}
 
 Write only the cover letter text, no explanations.
 """
 
+
+def generate_cover_letter(job, resume=RESUME, candidate_name="[Your Name]"):
+    """
+    Generate a tailored cover letter for a specific job posting.
+    """
+    
+    prompt = f"""
+{LETTER_TASK}
+
+{_format_job(job)}
+{_format_instructions(resume)}"""
+
     try:
         response = chat(
             model=LLM_MODEL,
             messages=[
-                {"role": "system", "content": "You are a professional cover letter writer. Write concise, personalized cover letters."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             stream=False
@@ -51,16 +72,168 @@ Write only the cover letter text, no explanations.
         return {"success": False, "error": str(e)}
 
 
-def generate_cover_letters_for_matches(matched_jobs, resume=RESUME):
+def normalize_resume(resume):
+    """Return the resume with repeated spaces and blank lines collapsed"""
+    text = "\n".join(" ".join(line.split()) for line in resume.splitlines())
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def extract_candidate_name(resume):
+    """Return the value of the "NAME:" line in the resume, or None"""
+    match = re.search(r"^\s*NAME:\s*(.+)$", resume, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+
+class CoverLetterSession:
+    """
+    Generates cover letters for one run using a shared prompt prefix.
+
+    The resume and all writing instructions live in
+    a single system message that is built once and stays byte-identical across calls.
+    With the model kept loaded (keep_alive), Ollama reuses the cached prefix, so each
+    call only evaluates the job-specific user message.
+    """
+    
+    def __init__(self, resume=RESUME, candidate_name=None, keep_alive=LLM_KEEP_ALIVE):
+        self.keep_alive = keep_alive
+        self.candidate_name = candidate_name or extract_candidate_name(resume) or "[Your Name]"
+        
+        # Resume-derived parts are computed once per run, not once per letter
+        self.system_prompt = self._build_system_prompt(normalize_resume(resume))
+        
+        self.prefix_tokens = 0
+        self.prefix_chars = 0
+        self.prefix_eval_ns = 0
+        self.stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "prompt_tokens": 0,
+            "prompt_eval_ns": 0,
+        }
+    
+    def _build_system_prompt(self, resume):
+        """Build the stable prefix shared by every cover letter in this run"""
+        return f"""{SYSTEM_PROMPT}
+
+{SESSION_TASK}
+
+{_format_instructions(resume, self.candidate_name)}"""
+    
+    def warm_up(self):
+        """
+        Evaluate the shared prefix once so it is cached before the first job.
+        Records the prefix token count used to estimate savings.
+        """
+        try:
+            response = chat(
+                model=LLM_MODEL,
+                messages=[{"role": "system", "content": self.system_prompt}],
+                stream=False,
+                keep_alive=self.keep_alive,
+                options={"num_predict": 1}
+            )
+            self.prefix_tokens = response.get('prompt_eval_count') or 0
+            self.prefix_chars = len(self.system_prompt)
+            self.prefix_eval_ns = response.get('prompt_eval_duration') or 0
+            print(f"  Cached shared prompt prefix ({self.prefix_tokens} tokens)")
+        except Exception as e:
+            print(f"  Could not warm up prompt prefix: {e}")
+    
+    def generate(self, job):
+        """
+        Generate a cover letter for one job, sending only the job-specific text
+        after the shared prefix. Returns the same dict as generate_cover_letter.
+        """
+        job_prompt = _format_job(job)
+        
+        try:
+            response = chat(
+                model=LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": job_prompt}
+                ],
+                stream=False,
+                keep_alive=self.keep_alive
+            )
+            
+            prompt_tokens = response.get('prompt_eval_count')
+            self.stats["calls"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens or 0
+            self.stats["prompt_eval_ns"] += response.get('prompt_eval_duration') or 0
+            if prompt_tokens is not None and self._is_cache_hit(prompt_tokens, job_prompt):
+                self.stats["cache_hits"] += 1
+            
+            cover_letter = response['message']['content'].strip()
+            return {
+                "success": True,
+                "cover_letter": cover_letter,
+                "job_title": job.get('title'),
+                "company": job.get('company'),
+                "prompt_tokens": prompt_tokens
+            }
+        
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def _is_cache_hit(self, prompt_tokens, job_prompt):
+        """
+        Compare evaluated tokens with the expected uncached total (prefix + job).
+        Job tokens are estimated from the prefix's tokens-per-character ratio; the
+        call counts as a hit when at least half of the prefix was skipped.
+        """
+        if not self.prefix_tokens:
+            return False
+        job_tokens = len(job_prompt) * self.prefix_tokens / self.prefix_chars
+        expected_uncached = self.prefix_tokens + job_tokens
+        return prompt_tokens <= expected_uncached - self.prefix_tokens / 2
+    
+    def get_report(self):
+        """
+        Summarize prompt evaluation for this run.
+        Savings are estimated as one prefix evaluation per cache hit.
+        """
+        hits = self.stats["cache_hits"]
+        return {
+            "calls": self.stats["calls"],
+            "cache_hits": hits,
+            "prefix_tokens": self.prefix_tokens,
+            "prompt_tokens_evaluated": self.stats["prompt_tokens"],
+            "prompt_tokens_saved": hits * self.prefix_tokens,
+            "prompt_eval_seconds": self.stats["prompt_eval_ns"] / 1e9,
+            "prompt_eval_seconds_saved": hits * self.prefix_eval_ns / 1e9,
+        }
+    
+    def print_report(self):
+        """Print the prompt reuse report"""
+        report = self.get_report()
+        print(f"  Prompt reuse: {report['cache_hits']}/{report['calls']} calls hit the cached prefix")
+        print(f"  Prompt tokens evaluated: {report['prompt_tokens_evaluated']} "
+              f"(saved ~{report['prompt_tokens_saved']})")
+        print(f"  Prompt eval time: {report['prompt_eval_seconds']:.1f}s "
+              f"(saved ~{report['prompt_eval_seconds_saved']:.1f}s)")
+
+
+def generate_cover_letters_for_matches(matched_jobs, resume=RESUME, shared_prefix=True, on_progress=None):
     """
     Generate cover letters for all matched jobs.
+    With shared_prefix=True the resume and instructions are sent once as a cached
+    prefix and only the job text is evaluated per letter.
+    on_progress(count, results) is called after each letter, e.g. to save progress.
     """
     results = []
+    session = None
+    if shared_prefix:
+        session = CoverLetterSession(resume)
+        session.warm_up()
     
     for idx, job in enumerate(matched_jobs):
         print(f"Generating cover letter {idx + 1}/{len(matched_jobs)}: {job.get('title', 'Unknown')}...")
         
-        cover_letter = generate_cover_letter(job, resume)
+        if session:
+            cover_letter = session.generate(job)
+        else:
+            cover_letter = generate_cover_letter(job, resume)
         
         job_with_letter = {
             **job,
@@ -68,15 +241,20 @@ def generate_cover_letters_for_matches(matched_jobs, resume=RESUME):
         }
         
         results.append(job_with_letter)
+        
+        if on_progress:
+            on_progress(idx + 1, results)
+    
+    if session:
+        session.print_report()
     
     return results
 
 
-def save_cover_letters(jobs_with_letters, filename="cover_letters.json"):
-    """Save generated cover letters to file"""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(jobs_with_letters, f, ensure_ascii=False, indent=2)
-    print(f"Saved cover letters to {filename}")
+def save_cover_letters(jobs_with_letters, filename="cover_letters.jsonl"):
+    """Save generated cover letters to JSON Lines file"""
+    path = write_records(jobs_with_letters, filename)
+    print(f"Saved cover letters to {path}")
 
 
 if __name__ == "__main__":
@@ -1,27 +1,55 @@
-import json
-from datetime import datetime
+import random
+from datetime import datetime, timedelta
 from playwright.sync_api import sync_playwright
 import time
-from config import JOB_SITES
+from persistence import write_json, read_json, write_records, read_records, remove, CorruptFileError
+from config import (
+    JOB_SITES,
+    SCRAPER_CHECKPOINT_FILE,
+    SCRAPER_CHECKPOINT_MAX_AGE_HOURS,
+    SCRAPER_MAX_RETRIES,
+    SCRAPER_BACKOFF_BASE,
+    SCRAPER_BACKOFF_MAX,
+)
 
-def scrape_poslovi_infostud(max_pages=5, limit=None):
+def scrape_poslovi_infostud(max_pages=5, limit=None, resume=True,
+                            checkpoint_file=SCRAPER_CHECKPOINT_FILE, max_retries=SCRAPER_MAX_RETRIES):
     """
     Scrape job listings from poslovi.infostud.com across multiple pages
     Args:
         max_pages: Number of pages to scrape (default 5)
         limit: Total job limit across all pages (None = no limit)
-    Returns list of job dicts with title, company, description, link, salary
+        resume: Continue from the last completed page in checkpoint_file if one exists
+        checkpoint_file: File where progress is saved after every completed page
+        max_retries: Extra attempts per page, with exponential backoff and jitter
+    Returns (jobs, complete): list of job dicts with title, company, description,
+    link, salary, and False if the crawl gave up on a page and can be resumed
     """
     jobs = []
     config = JOB_SITES["poslovi_infostud"]
     base_url = config["base_url"]
+    start_page = 1
     
+    if resume:
+        checkpoint = load_checkpoint(checkpoint_file)
+        if checkpoint:
+            reason = _checkpoint_mismatch(checkpoint, base_url, max_pages, limit)
+            if reason:
+                print(f"Discarding checkpoint ({reason}), starting from page 1")
+                clear_checkpoint(checkpoint_file)
+            else:
+                jobs = checkpoint["jobs"][:limit] if limit else checkpoint["jobs"]
+                start_page = checkpoint["last_page"] + 1
+                print(f"Resuming from checkpoint: {len(jobs)} jobs, continuing at page {start_page}")
+    
+    interrupted = False
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        # The browser is launched by the first attempt, so startup failures are retried too
+        browser = None
+        page = None
         
         try:
-            for page_num in range(1, max_pages + 1):
+            for page_num in range(start_page, max_pages + 1):
                 if limit and len(jobs) >= limit:
                     break
                 
@@ -32,87 +60,217 @@ def scrape_poslovi_infostud(max_pages=5, limit=None):
                     page_url = f"{base_url}?page={page_num}"
                 print(f"Scraping page {page_num}: {page_url}")
                 
-                page.goto(page_url, wait_until="networkidle", timeout=30000)
-                time.sleep(2)  # Wait for dynamic content to load
+                page_jobs = None
+                for attempt in range(max_retries + 1):
+                    try:
+                        # Recovery runs inside the attempt, so a failed relaunch
+                        # uses up one attempt instead of aborting the crawl
+                        if page is None:
+                            if browser is None or not browser.is_connected():
+                                if browser is not None:
+                                    print("  Browser crashed, relaunching...")
+                                    _close_browser(browser)
+                                browser = p.chromium.launch(headless=True)
+                            page = browser.new_page()
+                        
+                        page_jobs = _scrape_page(page, page_url, page_num, config)
+                        break
+                    except Exception as e:
+                        print(f"  ✗ Attempt {attempt + 1}/{max_retries + 1} failed for page {page_num}: {e}")
+                        
+                        # A crashed tab still reports is_closed() == False, so never reuse the page
+                        _close_page(page)
+                        page = None
+                        
+                        if attempt < max_retries:
+                            delay = _backoff_delay(attempt)
+                            print(f"  Retrying in {delay:.1f}s...")
+                            time.sleep(delay)
                 
-                # Select job cards using the correct infostud selector
-                job_cards = page.query_selector_all(config["selector_job_card"])
+                if page_jobs is None:
+                    print(f"Giving up on page {page_num}. Progress saved to {checkpoint_file}, run again to resume.")
+                    interrupted = True
+                    break
                 
-                if not job_cards:
+                if not page_jobs:
                     print(f"No jobs found on page {page_num}. Stopping pagination.")
                     break
                 
-                page_jobs_count = 0
-                for idx, card in enumerate(job_cards):
-                    if limit and len(jobs) >= limit:
-                        break
-                    
-                    try:
-                        # Extract job details using infostud HTML structure
-                        title_elem = card.query_selector(config["selector_title"])
-                        link_elem = card.query_selector(config["selector_link"])
-                        
-                        # Company is in a span after the building icon
-                        company_spans = card.query_selector_all(config["selector_company"])
-                        company = company_spans[0].inner_text() if len(company_spans) > 0 else "N/A"
-                        
-                        # Location is in the second location span
-                        location = company_spans[1].inner_text() if len(company_spans) > 1 else "N/A"
-                        
-                        # Description is in the line-clamp paragraph
-                        desc_elem = card.query_selector(config["selector_description"])
-                        
-                        # Skills are in the tag divs
-                        skill_elems = card.query_selector_all(config["selector_skills"])
-                        skills = [s.inner_text() for s in skill_elems if s.inner_text().strip() and s.inner_text() != "..."]
-                        
-                        job = {
-                            "title": title_elem.inner_text() if title_elem else "N/A",
-                            "company": company,
-                            "location": location,
-                            "description": desc_elem.inner_text() if desc_elem else "N/A",
-                            "link": link_elem.get_attribute("href") if link_elem else "N/A",
-                            "skills": skills,
-                            "scraped_at": datetime.now().isoformat()
-                        }
-                        
-                        # Extract just the clean URL without query params
-                        if job["link"] and "?" in job["link"]:
-                            job["link"] = job["link"].split("?")[0]
-                        
-                        jobs.append(job)
-                        page_jobs_count += 1
-                    except Exception as e:
-                        print(f"Error parsing job card {idx} on page {page_num}: {e}")
-                        continue
+                if limit:
+                    page_jobs = page_jobs[:limit - len(jobs)]
+                jobs.extend(page_jobs)
+                save_checkpoint(checkpoint_file, base_url, page_num, jobs, max_pages, limit)
                 
-                print(f"  ✓ Scraped {page_jobs_count} jobs from page {page_num}")
+                print(f"  ✓ Scraped {len(page_jobs)} jobs from page {page_num}")
                     
         finally:
-            browser.close()
+            _close_browser(browser)
+    
+    # Crawl finished, the next run should start from page 1 again
+    if not interrupted:
+        clear_checkpoint(checkpoint_file)
+    
+    return jobs, not interrupted
+
+
+def _close_page(page):
+    """Close a page, ignoring errors from a crashed or already closed tab"""
+    if page is None:
+        return
+    try:
+        page.close()
+    except Exception:
+        pass
+
+
+def _close_browser(browser):
+    """Close the browser, ignoring errors from an already crashed instance"""
+    if browser is None:
+        return
+    try:
+        browser.close()
+    except Exception:
+        pass
+
+
+def _backoff_delay(attempt, base=SCRAPER_BACKOFF_BASE, cap=SCRAPER_BACKOFF_MAX):
+    """
+    Exponential backoff with jitter: half of the delay is fixed,
+    the other half random, so retries from parallel runs don't line up.
+    """
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _scrape_page(page, page_url, page_num, config):
+    """
+    Load one results page and parse its job cards.
+    Returns an empty list if the page has no job cards.
+    Raises if the page fails to load or none of its cards can be parsed.
+    """
+    page.goto(page_url, wait_until="networkidle", timeout=30000)
+    time.sleep(2)  # Wait for dynamic content to load
+    
+    # Select job cards using the correct infostud selector
+    job_cards = page.query_selector_all(config["selector_job_card"])
+    
+    page_jobs = []
+    errors = 0
+    for idx, card in enumerate(job_cards):
+        try:
+            page_jobs.append(_parse_job_card(card, config))
+        except Exception as e:
+            errors += 1
+            print(f"Error parsing job card {idx} on page {page_num}: {e}")
+    
+    # Every card failing usually means the page broke mid-parse, so retry it
+    if job_cards and not page_jobs:
+        raise RuntimeError(f"all {errors} job cards failed to parse")
+    
+    if errors:
+        print(f"  Skipped {errors}/{len(job_cards)} job cards with parse errors")
+    
+    return page_jobs
+
+
+def _parse_job_card(card, config):
+    """Extract job details from a single infostud job card"""
+    title_elem = card.query_selector(config["selector_title"])
+    link_elem = card.query_selector(config["selector_link"])
+    
+    # Company is in a span after the building icon
+    company_spans = card.query_selector_all(config["selector_company"])
+    company = company_spans[0].inner_text() if len(company_spans) > 0 else "N/A"
+    
+    # Location is in the second location span
+    location = company_spans[1].inner_text() if len(company_spans) > 1 else "N/A"
     
-    return jobs
+    # Description is in the line-clamp paragraph
+    desc_elem = card.query_selector(config["selector_description"])
+    
+    # Skills are in the tag divs
+    skill_elems = card.query_selector_all(config["selector_skills"])
+    skills = [s.inner_text() for s in skill_elems if s.inner_text().strip() and s.inner_text() != "..."]
+    
+    job = {
+        "title": title_elem.inner_text() if title_elem else "N/A",
+        "company": company,
+        "location": location,
+        "description": desc_elem.inner_text() if desc_elem else "N/A",
+        "link": link_elem.get_attribute("href") if link_elem else "N/A",
+        "skills": skills,
+        "scraped_at": datetime.now().isoformat()
+    }
+    
+    # Extract just the clean URL without query params
+    if job["link"] and "?" in job["link"]:
+        job["link"] = job["link"].split("?")[0]
+    
+    return job
 
 
-def save_jobs_to_file(jobs, filename="jobs_raw.json"):
-    """Save scraped jobs to JSON file"""
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(jobs, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(jobs)} jobs to {filename}")
+def save_checkpoint(filename, base_url, last_page, jobs, max_pages=None, limit=None):
+    """Save crawl progress after a completed page"""
+    checkpoint = {
+        "base_url": base_url,
+        "max_pages": max_pages,
+        "limit": limit,
+        "last_page": last_page,
+        "jobs": jobs,
+        "saved_at": datetime.now().isoformat()
+    }
+    write_json(checkpoint, filename)
 
 
-def load_jobs_from_file(filename="jobs_raw.json"):
-    """Load jobs from JSON file"""
+def _checkpoint_mismatch(checkpoint, base_url, max_pages, limit,
+                         max_age_hours=SCRAPER_CHECKPOINT_MAX_AGE_HOURS):
+    """
+    Check whether a checkpoint belongs to the current crawl.
+    Returns the reason it can't be resumed, or None if it matches.
+    """
+    if checkpoint.get("base_url") != base_url:
+        return "different search URL"
+    if checkpoint.get("max_pages") != max_pages or checkpoint.get("limit") != limit:
+        return "different max_pages or limit"
     try:
-        with open(filename, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+        saved_at = datetime.fromisoformat(checkpoint["saved_at"])
+    except (KeyError, TypeError, ValueError):
+        return "missing save time"
+    if datetime.now() - saved_at > timedelta(hours=max_age_hours):
+        return f"older than {max_age_hours} hours"
+    return None
+
+
+def load_checkpoint(filename=SCRAPER_CHECKPOINT_FILE):
+    """Load crawl progress, or None if there is no checkpoint"""
+    try:
+        return read_json(filename)
+    except CorruptFileError as e:
+        print(f"Ignoring unreadable checkpoint: {e}")
+        return None
+
+
+def clear_checkpoint(filename=SCRAPER_CHECKPOINT_FILE):
+    """Remove the checkpoint, including copies saved with other compression settings"""
+    remove(filename)
+
+
+def save_jobs_to_file(jobs, filename="jobs_raw.jsonl"):
+    """Save scraped jobs to JSON Lines file"""
+    path = write_records(jobs, filename)
+    print(f"Saved {len(jobs)} jobs to {path}")
+
+
+def load_jobs_from_file(filename="jobs_raw.jsonl"):
+    """Load jobs from JSON Lines file (falls back to the old jobs_raw.json)"""
+    return read_records(filename)
 
 
 if __name__ == "__main__":
     print("Scraping jobs from poslovi.infostud.com...")
-    jobs = scrape_poslovi_infostud(max_pages=3, limit=100)
+    jobs, complete = scrape_poslovi_infostud(max_pages=3, limit=100)
+    if not complete:
+        print("Scrape interrupted, run again to resume from the checkpoint.")
     print(f"\nTotal jobs found: {len(jobs)}")
     for job in jobs[:3]:
         print(f"\n- {job['title']} at {job['company']}")
@@ -0,0 +1,223 @@
+"""
+Shared persistence layer for all JSON files written by the agent.
+
+Lists of records (jobs, matched jobs, cover letters) are stored as compact JSON Lines,
+single documents (applied jobs, checkpoints) as compact JSON. Files can be compressed
+with gzip or zstd, are written atomically through a temp file and rename, and older
+pretty-printed .json files are still read transparently.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from config import STORAGE_COMPRESSION
+
+# Faster encoder/decoder when installed, stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+# Errors raised by the decompressors and decoders on damaged files
+_DECODE_ERRORS = (OSError, EOFError, ValueError)
+if zstandard:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+class CorruptFileError(ValueError):
+    """Raised when a saved file exists but cannot be decompressed or decoded"""
+
+
+def dumps(obj, indent=None):
+    """Encode an object as UTF-8 JSON bytes, compact unless indent=2 is given"""
+    if indent:
+        if orjson and indent == 2:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        return json.dumps(obj, ensure_ascii=False, indent=indent).encode("utf-8")
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    """Decode JSON from bytes or str"""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def output_path(filename, compression=STORAGE_COMPRESSION):
+    """Return the path a file is written to, including the compression suffix"""
+    if not compression:
+        return filename
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression: {compression} (use 'gzip', 'zstd' or None)")
+    return filename + COMPRESSION_SUFFIXES[compression]
+
+
+def _variants(filename):
+    """All paths a logical filename can be stored under, plain file first"""
+    return [filename] + [filename + suffix for suffix in COMPRESSION_SUFFIXES.values()]
+
+
+def find_existing(filename, compression=STORAGE_COMPRESSION):
+    """
+    Find the file to read for a logical filename.
+    Tries the configured compression first, then the plain file, then any other
+    compression, and for .jsonl names also the legacy pretty-printed .json file.
+    Writes delete the other variants, so at most one of these exists.
+    Returns None if nothing exists.
+    """
+    names = [filename]
+    if filename.endswith(".jsonl"):
+        names.append(filename[:-1])
+
+    for name in names:
+        for path in [output_path(name, compression)] + _variants(name):
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def remove(filename, keep=None):
+    """
+    Delete a file together with all its compressed variants
+    (and the legacy .json file for .jsonl names), except the path in keep.
+    """
+    paths = _variants(filename)
+    if filename.endswith(".jsonl"):
+        paths += _variants(filename[:-1])
+    for path in paths:
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _compress(data, path):
+    if path.endswith(".gz"):
+        return gzip.compress(data)
+    if path.endswith(".zst"):
+        if not zstandard:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+
+def _decompress(data, path):
+    if path.endswith(".gz"):
+        return gzip.decompress(data)
+    if path.endswith(".zst"):
+        if not zstandard:
+            # Reported as unreadable (wrapped by _read_bytes) so callers handle one error type
+            raise CorruptFileError("reading zstd files requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return data
+
+
+def _file_mode(path):
+    """Mode for a written file: keep the existing file's mode, else 0666 minus umask"""
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _write_atomic(data, path):
+    """Write bytes to a temp file next to path and rename it into place"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600, give it the mode open() would have
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _read_bytes(filename, compression):
+    path = find_existing(filename, compression)
+    if path is None:
+        return None, None
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        return _decompress(data, path), path
+    except _DECODE_ERRORS as e:
+        raise CorruptFileError(f"Cannot decompress {path}: {e}") from e
+
+
+def _loads(data, path):
+    try:
+        return loads(data)
+    except _DECODE_ERRORS as e:
+        raise CorruptFileError(f"Cannot decode {path}: {e}") from e
+
+
+def write_json(obj, filename, compression=STORAGE_COMPRESSION, indent=None):
+    """Save one object as JSON, compact unless indent is given. Returns the path written."""
+    path = output_path(filename, compression)
+    _write_atomic(_compress(dumps(obj, indent=indent), path), path)
+    # Stale copies under another compression setting would shadow this one on read
+    remove(filename, keep=path)
+    return path
+
+
+def read_json(filename, default=None, compression=STORAGE_COMPRESSION):
+    """
+    Load one JSON object, or default if the file does not exist.
+    Raises CorruptFileError if the file cannot be decompressed or decoded.
+    """
+    data, path = _read_bytes(filename, compression)
+    if data is None:
+        return default
+    return _loads(data, path)
+
+
+def write_records(records, filename, compression=STORAGE_COMPRESSION):
+    """Save a list of objects as JSON Lines, one object per line. Returns the path written."""
+    data = b"".join(dumps(record) + b"\n" for record in records)
+    path = output_path(filename, compression)
+    _write_atomic(_compress(data, path), path)
+    remove(filename, keep=path)
+    return path
+
+
+def read_records(filename, compression=STORAGE_COMPRESSION):
+    """
+    Load a list of objects from JSON Lines.
+    Legacy files holding a single JSON array are read as well.
+    Returns an empty list if the file does not exist.
+    Raises CorruptFileError if the file cannot be decompressed or decoded.
+    """
+    data, path = _read_bytes(filename, compression)
+    if data is None:
+        return []
+
+    data = data.strip()
+    if data.startswith(b"["):
+        return _loads(data, path)
+    return [_loads(line, path) for line in data.splitlines() if line.strip()]